@@ -1,21 +1,42 @@
 import os
 import json
-import uuid
+import secrets
 import sys
+import threading
+import zlib
+from contextlib import contextmanager
+from functools import wraps
+from bisect import bisect_left, bisect_right
+from operator import itemgetter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
 
-from flask import Flask, render_template, request, jsonify, send_file
-from PyPDF2 import PdfReader
-from openpyxl import Workbook, load_workbook
+from flask import Flask, render_template, request, jsonify, send_file, make_response
+
+try:
+    import orjson
+except ImportError:  # optional, falls back to the stdlib json module
+    orjson = None
+try:
+    import fcntl
+except ImportError:  # Windows: only single-process servers (waitress, dev server)
+    fcntl = None
+import xlsxwriter
+
+from pdf_pages import count_pdf_pages
 
 app = Flask(__name__)
 
 BASE_DIR = Path(__file__).resolve().parent
 OUTPUT_DIR = BASE_DIR / "Output"
 DATA_DIR = BASE_DIR / "data"
-HISTORY_FILE = DATA_DIR / "history.json"
+HISTORY_FILE = DATA_DIR / "history.jsonl"
+LEGACY_HISTORY_FILE = DATA_DIR / "history.json"
+LOCK_FILE = DATA_DIR / "history.lock"
 EXCEL_FILE = DATA_DIR / "history.xlsx"
+EXCEL_KEY_FILE = DATA_DIR / "history.xlsx.key"
+EXCEL_LOCK_FILE = DATA_DIR / "history.xlsx.lock"
 
 OUTPUT_DIR.mkdir(exist_ok=True)
 DATA_DIR.mkdir(exist_ok=True)
@@ -23,64 +44,470 @@ DATA_DIR.mkdir(exist_ok=True)
 COST_PER_PAGE = 2000.0 / (700 * 30)  # ~0.095238 EUR
 MAX_FILES = 20
 MAX_FILE_SIZE_MB = 100
+# Largest acceptable upload request: MAX_FILES files at the size limit, plus
+# 1 MB for the multipart framing. Werkzeug rejects anything bigger itself.
+MAX_REQUEST_BYTES = MAX_FILES * MAX_FILE_SIZE_MB * 1024 * 1024 + 1024 * 1024
+app.config["MAX_CONTENT_LENGTH"] = MAX_REQUEST_BYTES
+# history.jsonl is compacted once it holds more dead lines than this and
+# more dead lines than live ones.
+COMPACT_MIN_DEAD_LINES = 100
+
+_timestamp = itemgetter("timestamp")
+# Summing with map(itemgetter) keeps the loop in C, unlike a generator.
+_pages = itemgetter("pages")
+_cost = itemgetter("cost")
+
+
+class _Timestamps:
+    """Read-only view of the timestamps of a sorted upload list, for bisect.
+
+    Stands in for bisect's key= argument, which needs Python 3.10.
+    """
+    __slots__ = ("uploads",)
+
+    def __init__(self, uploads):
+        self.uploads = uploads
+
+    def __len__(self):
+        return len(self.uploads)
+
+    def __getitem__(self, i):
+        return self.uploads[i]["timestamp"]
+
+
+# Parsed history, keyed by the file's (mtime, size, inode) so repeated
+# requests skip the disk read + JSON parse until the file actually changes.
+_HISTORY_CACHE = {"key": None, "data": None}
+_lock = threading.Lock()
+
+# Held by mutating endpoints from load_history() until their records are
+# appended, so two requests never append on top of the same stale copy.
+# See history_write_lock(), which adds a file lock for multi-worker servers.
+_write_lock = threading.Lock()
+
+_excel_lock = threading.Lock()
 
 # ---------------------------------------------------------------------------
 # History helpers
 # ---------------------------------------------------------------------------
 
-def load_history():
-    if HISTORY_FILE.exists():
-        with open(HISTORY_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {"uploads": [], "settings": {"monthly_income": 2000, "daily_pages": 700, "days_per_month": 30}}
+# history.jsonl is an append-only log with one JSON record per line:
+#   {"id": ..., "filename": ..., ...}   an upload entry
+#   {"_delete": "<id>"}                  drops an earlier upload entry
+#   {"_settings": {...}}                 replaces the settings
+# Mutations append a few lines; the whole file is only rewritten when it is
+# compacted.
 
+if orjson is not None:
+    _loads = orjson.loads
 
-def save_history(data):
-    with open(HISTORY_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    save_excel(data)
+    def _dump_line(record):
+        return orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE)
+else:
+    _loads = json.loads
 
+    def _dump_line(record):
+        return (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
 
-def save_excel(data):
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Upload History"
-    ws.append(["ID", "Data", "Ora", "Fisier", "Pagini", "Cost (EUR)", "Marime (MB)"])
-    for u in data["uploads"]:
-        ts = u.get("timestamp", u["date"])
-        date_part = ts[:10]
-        time_part = ts[11:19] if len(ts) > 10 else ""
-        size_mb = round(u.get("size_bytes", 0) / (1024 * 1024), 2)
-        ws.append([u["id"][:8], date_part, time_part, u["filename"], u["pages"], round(u["cost"], 4), size_mb])
 
-    ws_daily = wb.create_sheet("Sumar Zilnic")
-    ws_daily.append(["Data", "Fisiere", "Pagini", "Cost (EUR)"])
-    daily = {}
+def _default_settings():
+    return {"monthly_income": 2000, "daily_pages": 700, "days_per_month": 30}
+
+
+def _default_history():
+    return _prepare_history({"uploads": [], "settings": _default_settings()})
+
+
+def _prepare_history(data):
+    """Fill in derived data for freshly loaded history.
+
+    Only "uploads" and "settings" are persisted; the aggregates and the
+    "_"-prefixed indexes are rebuilt here.
+    """
+    # Uploads are kept in timestamp order so /api/history can slice date
+    # ranges with bisect. Normally already sorted, which makes this O(N).
+    data["uploads"].sort(key=_timestamp)
     for u in data["uploads"]:
-        d = u["timestamp"][:10]
-        if d not in daily:
-            daily[d] = {"files": 0, "pages": 0, "cost": 0.0}
-        daily[d]["files"] += 1
-        daily[d]["pages"] += u["pages"]
-        daily[d]["cost"] += u["cost"]
-    for d in sorted(daily.keys(), reverse=True):
-        ws_daily.append([d, daily[d]["files"], daily[d]["pages"], round(daily[d]["cost"], 4)])
+        if "month" not in u:  # entries written before "month" was stored
+            u["month"] = u["date"][:7]
+    _rebuild_aggregates(data)
+    data["_lines"] = 0
+    data["_key"] = None
+    data["_by_id"] = {u["id"]: u for u in data["uploads"]}
+    data["_filename_index"] = {u["filename"]: u["id"] for u in data["uploads"]}
+    data["_search_names"] = {u["id"]: u["filename"].lower() for u in data["uploads"]}
+    return data
+
+
+def _add_upload(history, entry):
+    uploads = history["uploads"]
+    uploads.insert(bisect_right(_Timestamps(uploads), entry["timestamp"]), entry)
+    history["_by_id"][entry["id"]] = entry
+    history["_filename_index"][entry["filename"]] = entry["id"]
+    history["_search_names"][entry["id"]] = entry["filename"].lower()
+    _aggregate_add(history, entry)
 
-    wb.save(str(EXCEL_FILE))
 
+def _drop_upload(history, entry):
+    """Delete the stored PDF and unindex the entry.
 
-def count_pdf_pages(filepath):
+    Removing it from history["uploads"] is left to the caller, so bulk
+    deletes can rebuild the list in a single pass.
+    """
     try:
-        reader = PdfReader(str(filepath))
-        return len(reader.pages)
-    except Exception as e:
-        print(f"Error reading {filepath}: {e}", file=sys.stderr)
-        return 0
+        (OUTPUT_DIR / entry.get("saved_as", "")).unlink()
+    except FileNotFoundError:
+        pass
+    del history["_by_id"][entry["id"]]
+    del history["_search_names"][entry["id"]]
+    if history["_filename_index"].get(entry["filename"]) == entry["id"]:
+        del history["_filename_index"][entry["filename"]]
+    _aggregate_remove(history, entry)
+
+
+# Per-day and per-month totals are kept next to the uploads and updated on
+# every insert/delete, so the summary endpoints never re-scan the full
+# upload list.
+
+def _own_aggregate(history, table, key):
+    """Return history[table][key], copying it first if it is still shared.
+
+    Working copies from load_history() share their aggregate records with
+    the cached history; "_owned" lists the ones already copied.
+    """
+    record = history[table][key]
+    owned = history.get("_owned")
+    if owned is not None and (table, key) not in owned:
+        record = history[table][key] = dict(record)
+        if "filenames" in record:
+            record["filenames"] = list(record["filenames"])
+        owned.add((table, key))
+    return record
+
+
+def _aggregate_add(history, u):
+    history.pop("_daily_columns", None)
+    d = u["date"]
+    m = u["month"]
+    if m in history["monthly"]:
+        month = _own_aggregate(history, "monthly", m)
+    else:
+        month = history["monthly"][m] = {"files": 0, "pages": 0, "cost": 0.0, "days_active": 0}
+        if "_owned" in history:
+            history["_owned"].add(("monthly", m))
+    if d in history["daily"]:
+        day = _own_aggregate(history, "daily", d)
+    else:
+        day = history["daily"][d] = {"files": 0, "pages": 0, "cost": 0.0, "filenames": []}
+        if "_owned" in history:
+            history["_owned"].add(("daily", d))
+        month["days_active"] += 1
+    for agg in (day, month):
+        agg["files"] += 1
+        agg["pages"] += u["pages"]
+        agg["cost"] = round(agg["cost"] + u["cost"], 4)
+    day["filenames"].append(u["filename"])
+
+
+def _aggregate_remove(history, u):
+    history.pop("_daily_columns", None)
+    d = u["date"]
+    m = u["month"]
+    day = _own_aggregate(history, "daily", d)
+    month = _own_aggregate(history, "monthly", m)
+    for agg in (day, month):
+        agg["files"] -= 1
+        agg["pages"] -= u["pages"]
+        agg["cost"] = round(agg["cost"] - u["cost"], 4)
+    day["filenames"].remove(u["filename"])
+    if day["files"] == 0:
+        del history["daily"][d]
+        month["days_active"] -= 1
+    if month["files"] == 0:
+        del history["monthly"][m]
+
+
+def _rebuild_aggregates(history):
+    history.pop("_daily_columns", None)
+    history["daily"] = {}
+    history["monthly"] = {}
+    for u in history["uploads"]:
+        _aggregate_add(history, u)
+
+
+def _daily_columns(history):
+    """Return the daily totals as columns: sorted dates plus running sums.
+
+    files[i], pages[i] and cost[i] hold the totals of all days before
+    dates[i], so any date range sums to a difference of two entries.
+    Built lazily and dropped whenever the aggregates change.
+    """
+    columns = history.get("_daily_columns")
+    if columns is None:
+        dates = sorted(history["daily"])
+        files, pages, cost = [0], [0], [0.0]
+        for d in dates:
+            agg = history["daily"][d]
+            files.append(files[-1] + agg["files"])
+            pages.append(pages[-1] + agg["pages"])
+            cost.append(round(cost[-1] + agg["cost"], 4))
+        columns = history["_daily_columns"] = (dates, files, pages, cost)
+    return columns
+
+
+def _date_range(dates, date_from=None, date_to=None):
+    """Index bounds [lo, hi) of the sorted dates within date_from..date_to."""
+    lo = bisect_left(dates, date_from) if date_from else 0
+    hi = bisect_right(dates, date_to) if date_to else len(dates)
+    return lo, hi
+
+
+def _period_totals(history, date_from=None, date_to=None):
+    dates, files, pages, cost = _daily_columns(history)
+    lo, hi = _date_range(dates, date_from, date_to)
+    return {
+        "files": files[hi] - files[lo],
+        "pages": pages[hi] - pages[lo],
+        "cost": round(cost[hi] - cost[lo], 4),
+    }
+
+
+def _history_key(st):
+    """Cache key for history.jsonl.
+
+    The size is part of the key because mtimes can be coarse and another
+    worker may append within the same tick; the inode catches a compaction
+    that happens to leave both unchanged.
+    """
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def _read_history_file():
+    """Replay history.jsonl into a prepared history dict.
+
+    Only the bytes present when the file was opened are replayed, so the
+    result always matches the key it is cached under even if another
+    worker appends meanwhile.
+    """
+    entries = {}
+    settings = None
+    lines = 0
+    damaged = False
+    with open(HISTORY_FILE, "rb") as f:
+        st = os.fstat(f.fileno())
+        payload = f.read(st.st_size)
+    for line in payload.split(b"\n"):
+        if not line.strip():
+            continue
+        try:
+            record = _loads(line)
+        except ValueError:
+            print(f"Skipping unreadable line in {HISTORY_FILE}", file=sys.stderr)
+            damaged = True
+            continue
+        lines += 1
+        if "_delete" in record:
+            entries.pop(record["_delete"], None)
+        elif "_settings" in record:
+            settings = record["_settings"]
+        else:
+            entries[record["id"]] = record
+    data = _prepare_history({"uploads": list(entries.values()), "settings": settings or _default_settings()})
+    data["_lines"] = lines
+    data["_key"] = _history_key(st)
+    if damaged:
+        # Most likely a crash mid-append. The next write compacts instead of
+        # appending, so no record lands on the end of the partial line.
+        data["_damaged"] = True
+    return data
+
+
+def _write_history_file(data):
+    """Rewrite history.jsonl with only the live records.
+
+    Callers hold _lock and history_write_lock().
+    """
+    records = [{"_settings": data["settings"]}] + data["uploads"]
+    payload = b"".join(map(_dump_line, records))
+    tmp_path = HISTORY_FILE.with_suffix(".jsonl.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(payload)
+    os.replace(tmp_path, HISTORY_FILE)
+    data["_lines"] = len(records)
+    data["_key"] = _history_key(HISTORY_FILE.stat())
+    data.pop("_damaged", None)
+    data.pop("_owned", None)
+    _HISTORY_CACHE["data"] = data
+    _HISTORY_CACHE["key"] = data["_key"]
+
+
+@contextmanager
+def _process_lock(thread_lock, lock_path):
+    """Hold thread_lock and, where fcntl is available, a flock on lock_path.
+
+    Covers threads of this process and the other worker processes of a
+    multi-worker server such as gunicorn.
+    """
+    with thread_lock:
+        if fcntl is None:
+            yield
+            return
+        with open(lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def history_write_lock():
+    """Serialize load -> modify -> write cycles on history.jsonl."""
+    return _process_lock(_write_lock, LOCK_FILE)
+
+
+def _migrate_legacy_history():
+    """Convert the old single-document history.json into history.jsonl.
+
+    Runs once at import, before any request is served.
+    """
+    with history_write_lock(), _lock:
+        if HISTORY_FILE.exists() or not LEGACY_HISTORY_FILE.exists():
+            return
+        legacy = _loads(LEGACY_HISTORY_FILE.read_bytes())
+        _write_history_file(_prepare_history({
+            "uploads": legacy["uploads"],
+            "settings": legacy.get("settings", _default_settings()),
+        }))
+
+
+def load_history_readonly():
+    """Return the cached history. Callers must not mutate the result."""
+    with _lock:
+        try:
+            key = _history_key(HISTORY_FILE.stat())
+        except FileNotFoundError:
+            return _default_history()
+        if _HISTORY_CACHE["data"] is None or _HISTORY_CACHE["key"] != key:
+            _HISTORY_CACHE["data"] = _read_history_file()
+            _HISTORY_CACHE["key"] = _HISTORY_CACHE["data"]["_key"]
+        return _HISTORY_CACHE["data"]
+
+
+def load_history():
+    """Return a working copy of the history that the caller may modify and save.
+
+    Copy-on-write: the upload list and the index/aggregate dicts are copied
+    shallowly, aggregate records are copied when first touched (see
+    _own_aggregate) and upload entries are shared, so they must be replaced
+    rather than modified in place.
+    """
+    cached = load_history_readonly()
+    data = dict(cached)
+    data["uploads"] = list(cached["uploads"])
+    for key in ("settings", "daily", "monthly", "_by_id", "_filename_index", "_search_names"):
+        data[key] = dict(cached[key])
+    data["_owned"] = set()
+    return data
+
+
+def append_history(data, records):
+    """Append records to history.jsonl and make data the cached history.
+
+    data must already reflect the records. Callers hold history_write_lock().
+    """
+    if not records:
+        return
+    with _lock:
+        live = len(data["uploads"]) + 1
+        dead = data["_lines"] + len(records) - live
+        if data.get("_damaged") or (dead > COMPACT_MIN_DEAD_LINES and dead > live):
+            _write_history_file(data)
+            return
+        with open(HISTORY_FILE, "ab") as f:
+            f.write(b"".join(map(_dump_line, records)))
+        data["_lines"] += len(records)
+        data["_key"] = _history_key(HISTORY_FILE.stat())
+        data.pop("_owned", None)
+        _HISTORY_CACHE["data"] = data
+        _HISTORY_CACHE["key"] = data["_key"]
+
+
+def save_excel(data):
+    # Written under a temporary name so a concurrent export never sends a
+    # half-written workbook.
+    tmp_path = EXCEL_FILE.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    # constant_memory flushes each row to disk once the next one starts, so
+    # memory use does not grow with the history.
+    wb = xlsxwriter.Workbook(str(tmp_path), {"constant_memory": True, "strings_to_numbers": False})
+    ws = wb.add_worksheet("Upload History")
+    ws.write_row(0, 0, ["ID", "Data", "Ora", "Fisier", "Pagini", "Cost (EUR)", "Marime (MB)"])
+    for row, u in enumerate(data["uploads"], 1):
+        ts = u.get("timestamp", u["date"])
+        date_part = u["date"]
+        time_part = ts[11:19] if len(ts) > 10 else ""
+        size_mb = round(u.get("size_bytes", 0) / (1024 * 1024), 2)
+        ws.write_row(row, 0, [u["id"][:8], date_part, time_part, u["filename"], u["pages"], round(u["cost"], 4), size_mb])
+
+    ws_daily = wb.add_worksheet("Sumar Zilnic")
+    ws_daily.write_row(0, 0, ["Data", "Fisiere", "Pagini", "Cost (EUR)"])
+    daily = data["daily"]
+    for row, d in enumerate(sorted(daily.keys(), reverse=True), 1):
+        ws_daily.write_row(row, 0, [d, daily[d]["files"], daily[d]["pages"], round(daily[d]["cost"], 4)])
+
+    wb.close()
+    os.replace(tmp_path, EXCEL_FILE)
+
+
+def _save_upload(f, save_path):
+    """Stream an uploaded file to save_path and return its size in bytes.
+
+    Stops as soon as the file exceeds MAX_FILE_SIZE_MB, removes the partial
+    copy and returns None.
+    """
+    limit = MAX_FILE_SIZE_MB * 1024 * 1024
+    size = 0
+    with open(save_path, "wb") as out:
+        for chunk in iter(lambda: f.stream.read(1 << 20), b""):
+            size += len(chunk)
+            if size > limit:
+                break
+            out.write(chunk)
+    if size > limit:
+        save_path.unlink()
+        return None
+    return size
 
 # ---------------------------------------------------------------------------
 # Routes
 # ---------------------------------------------------------------------------
 
+def cached_on_history(view):
+    """Answer 304 Not Modified while history and the query are unchanged.
+
+    The ETag combines the history file's mtime and size, today's date (the stats
+    roll over at midnight) and the query string, so it can be checked
+    before any work is done. Responses are marked no-cache: the page
+    reloads these endpoints right after every upload/delete and must not
+    be served a stale copy, but revalidation is a cheap 304.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        try:
+            st = HISTORY_FILE.stat()
+            version = f"{st.st_mtime_ns}.{st.st_size}"
+        except FileNotFoundError:
+            version = "0"
+        etag = f"{version}-{datetime.now():%Y%m%d}-{zlib.crc32(request.query_string):08x}"
+        if etag in request.if_none_match:
+            response = make_response("", 304)
+        else:
+            response = make_response(view(*args, **kwargs))
+        response.set_etag(etag)
+        response.cache_control.no_cache = True
+        return response
+    return wrapper
+
+
 @app.route("/")
 def index():
     return render_template("index.html")
@@ -88,6 +515,9 @@ def index():
 
 @app.route("/api/upload", methods=["POST"])
 def upload_files():
+    if request.content_length and request.content_length > MAX_REQUEST_BYTES:
+        return jsonify({"error": f"Upload prea mare (max {MAX_FILES} x {MAX_FILE_SIZE_MB}MB)"}), 413
+
     if "files" not in request.files:
         return jsonify({"error": "Nu s-au trimis fisiere"}), 400
 
@@ -95,9 +525,9 @@ def upload_files():
     if len(files) > MAX_FILES:
         return jsonify({"error": f"Maxim {MAX_FILES} fisiere permise"}), 400
 
-    history = load_history()
-    existing_names = {u["filename"] for u in history["uploads"]}
+    existing_names = load_history_readonly()["_filename_index"]
     results = []
+    pending = []
     now = datetime.now()
 
     for f in files:
@@ -109,60 +539,80 @@ def upload_files():
             results.append({"filename": f.filename, "error": "Duplicat - exista deja in istoric", "pages": 0, "cost": 0})
             continue
 
-        file_id = uuid.uuid4().hex[:12]
+        file_id = secrets.token_hex(6)
         safe_name = f"{file_id}_{f.filename}"
         save_path = OUTPUT_DIR / safe_name
-        f.save(str(save_path))
-
-        size_bytes = save_path.stat().st_size
-        if size_bytes > MAX_FILE_SIZE_MB * 1024 * 1024:
-            save_path.unlink()
+        size_bytes = _save_upload(f, save_path)
+        if size_bytes is None:
             results.append({"filename": f.filename, "error": f"Fisier prea mare (max {MAX_FILE_SIZE_MB}MB)", "pages": 0, "cost": 0})
             continue
 
-        pages = count_pdf_pages(save_path)
+        results.append(None)  # filled in once the page count is known
+        pending.append((len(results) - 1, file_id, f.filename, safe_name, save_path, size_bytes))
+
+    # Page counting is independent per file, so count all accepted PDFs at once.
+    if pending:
+        with ThreadPoolExecutor(max_workers=min(len(pending), os.cpu_count() or 4)) as ex:
+            page_counts = list(ex.map(count_pdf_pages, [p[4] for p in pending]))
+    else:
+        page_counts = []
+
+    entries = []
+    for (idx, file_id, filename, safe_name, save_path, size_bytes), pages in zip(pending, page_counts):
         cost = round(pages * COST_PER_PAGE, 4)
 
-        entry = {
+        entries.append({
             "id": file_id,
             "date": now.strftime("%Y-%m-%d"),
+            "month": now.strftime("%Y-%m"),
             "timestamp": now.isoformat(timespec="seconds"),
-            "filename": f.filename,
+            "filename": filename,
             "saved_as": safe_name,
             "pages": pages,
             "cost": cost,
             "size_bytes": size_bytes,
-        }
-        history["uploads"].append(entry)
-        results.append({"filename": f.filename, "pages": pages, "cost": cost, "size_mb": round(size_bytes / 1048576, 2), "id": file_id})
+        })
+        results[idx] = {"filename": filename, "pages": pages, "cost": cost, "size_mb": round(size_bytes / 1048576, 2), "id": file_id}
 
-    save_history(history)
-    total_pages = sum(r.get("pages", 0) for r in results)
-    total_cost = round(sum(r.get("cost", 0) for r in results), 4)
+    with history_write_lock():
+        history = load_history()
+        # existing_names was read without the lock; another request (or
+        # worker) may have stored the same filename since.
+        added = []
+        for (idx, _, _, _, save_path, _), entry in zip(pending, entries):
+            if entry["filename"] in history["_filename_index"]:
+                results[idx] = {"filename": entry["filename"], "error": "Duplicat - exista deja in istoric", "pages": 0, "cost": 0}
+                save_path.unlink(missing_ok=True)
+                continue
+            _add_upload(history, entry)
+            added.append(entry)
+        append_history(history, added)
+    total_pages = sum(map(_pages, results))
+    total_cost = round(sum(map(_cost, results)), 4)
 
     return jsonify({"results": results, "total_pages": total_pages, "total_cost": total_cost, "cost_per_page": round(COST_PER_PAGE, 6)})
 
 
 @app.route("/api/history")
+@cached_on_history
 def get_history():
-    history = load_history()
+    history = load_history_readonly()
     date_from = request.args.get("from")
     date_to = request.args.get("to")
     search = request.args.get("search", "").lower()
 
-    uploads = history["uploads"]
-
-    if date_from:
-        uploads = [u for u in uploads if u["timestamp"][:10] >= date_from]
-    if date_to:
-        uploads = [u for u in uploads if u["timestamp"][:10] <= date_to]
-    if search:
-        uploads = [u for u in uploads if search in u["filename"].lower()]
+    # history["uploads"] is sorted by timestamp, so the date range is a slice;
+    # "\uffff" sorts after every timestamp that starts with date_to.
+    all_uploads = history["uploads"]
+    timestamps = _Timestamps(all_uploads)
+    lo = bisect_left(timestamps, date_from) if date_from else 0
+    hi = bisect_right(timestamps, date_to + "\uffff") if date_to else len(all_uploads)
 
-    uploads = sorted(uploads, key=lambda x: x["timestamp"], reverse=True)
+    names = history["_search_names"]
+    uploads = [u for u in reversed(all_uploads[lo:hi]) if not search or search in names[u["id"]]]
 
-    total_pages = sum(u["pages"] for u in uploads)
-    total_cost = round(sum(u["cost"] for u in uploads), 4)
+    total_pages = sum(map(_pages, uploads))
+    total_cost = round(sum(map(_cost, uploads)), 4)
     total_files = len(uploads)
 
     return jsonify({
@@ -175,126 +625,86 @@ def get_history():
 
 
 @app.route("/api/daily-summary")
+@cached_on_history
 def daily_summary():
-    history = load_history()
+    history = load_history_readonly()
     date_from = request.args.get("from")
     date_to = request.args.get("to")
 
-    uploads = history["uploads"]
-    if date_from:
-        uploads = [u for u in uploads if u["timestamp"][:10] >= date_from]
-    if date_to:
-        uploads = [u for u in uploads if u["timestamp"][:10] <= date_to]
-
-    daily = {}
-    for u in uploads:
-        d = u["timestamp"][:10]
-        if d not in daily:
-            daily[d] = {"date": d, "files": 0, "pages": 0, "cost": 0.0, "filenames": []}
-        daily[d]["files"] += 1
-        daily[d]["pages"] += u["pages"]
-        daily[d]["cost"] += u["cost"]
-        daily[d]["filenames"].append(u["filename"])
-
-    for d in daily:
-        daily[d]["cost"] = round(daily[d]["cost"], 4)
-
-    result = sorted(daily.values(), key=lambda x: x["date"], reverse=True)
+    dates = _daily_columns(history)[0]
+    lo, hi = _date_range(dates, date_from, date_to)
+    result = []
+    for d in reversed(dates[lo:hi]):
+        agg = history["daily"][d]
+        result.append({"date": d, "files": agg["files"], "pages": agg["pages"],
+                       "cost": round(agg["cost"], 4), "filenames": agg["filenames"]})
     return jsonify({"days": result})
 
 
 @app.route("/api/monthly-summary")
+@cached_on_history
 def monthly_summary():
-    history = load_history()
-    monthly = {}
-    for u in history["uploads"]:
-        m = u["timestamp"][:7]  # YYYY-MM
-        if m not in monthly:
-            monthly[m] = {"month": m, "files": 0, "pages": 0, "cost": 0.0, "days_active": set()}
-        monthly[m]["files"] += 1
-        monthly[m]["pages"] += u["pages"]
-        monthly[m]["cost"] += u["cost"]
-        monthly[m]["days_active"].add(u["timestamp"][:10])
-
+    history = load_history_readonly()
     result = []
-    for m in sorted(monthly.keys(), reverse=True):
-        entry = monthly[m]
-        entry["cost"] = round(entry["cost"], 4)
-        entry["days_active"] = len(entry["days_active"])
-        result.append(entry)
+    for m in sorted(history["monthly"].keys(), reverse=True):
+        agg = history["monthly"][m]
+        result.append({"month": m, "files": agg["files"], "pages": agg["pages"],
+                       "cost": round(agg["cost"], 4), "days_active": agg["days_active"]})
 
     return jsonify({"months": result})
 
 
 @app.route("/api/stats")
+@cached_on_history
 def get_stats():
-    history = load_history()
-    uploads = history["uploads"]
+    history = load_history_readonly()
     today = datetime.now().strftime("%Y-%m-%d")
-
-    today_uploads = [u for u in uploads if u["timestamp"][:10] == today]
-    today_pages = sum(u["pages"] for u in today_uploads)
-    today_cost = round(sum(u["cost"] for u in today_uploads), 4)
-    today_files = len(today_uploads)
-
-    total_pages = sum(u["pages"] for u in uploads)
-    total_cost = round(sum(u["cost"] for u in uploads), 4)
-    total_files = len(uploads)
-
     week_ago = (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d")
-    week_uploads = [u for u in uploads if u["timestamp"][:10] >= week_ago]
-    week_pages = sum(u["pages"] for u in week_uploads)
-    week_cost = round(sum(u["cost"] for u in week_uploads), 4)
-
     month_start = datetime.now().strftime("%Y-%m-01")
-    month_uploads = [u for u in uploads if u["timestamp"][:10] >= month_start]
-    month_pages = sum(u["pages"] for u in month_uploads)
-    month_cost = round(sum(u["cost"] for u in month_uploads), 4)
 
     return jsonify({
-        "today": {"files": today_files, "pages": today_pages, "cost": today_cost},
-        "week": {"pages": week_pages, "cost": week_cost, "files": len(week_uploads)},
-        "month": {"pages": month_pages, "cost": month_cost, "files": len(month_uploads)},
-        "total": {"files": total_files, "pages": total_pages, "cost": total_cost},
+        "today": _period_totals(history, today, today),
+        "week": _period_totals(history, week_ago),
+        "month": _period_totals(history, month_start),
+        "total": _period_totals(history),
         "cost_per_page": round(COST_PER_PAGE, 6),
     })
 
 
 @app.route("/api/delete/<upload_id>", methods=["DELETE"])
 def delete_upload(upload_id):
-    history = load_history()
-    entry = next((u for u in history["uploads"] if u["id"] == upload_id), None)
-    if not entry:
-        return jsonify({"error": "Nu s-a gasit"}), 404
-
-    filepath = OUTPUT_DIR / entry.get("saved_as", "")
-    if filepath.exists():
-        filepath.unlink()
+    with history_write_lock():
+        history = load_history()
+        entry = history["_by_id"].get(upload_id)
+        if not entry:
+            return jsonify({"error": "Nu s-a gasit"}), 404
 
-    history["uploads"] = [u for u in history["uploads"] if u["id"] != upload_id]
-    save_history(history)
+        _drop_upload(history, entry)
+        history["uploads"].remove(entry)
+        append_history(history, [{"_delete": upload_id}])
     return jsonify({"success": True})
 
 
 @app.route("/api/delete-bulk", methods=["POST"])
 def delete_bulk():
     data = request.get_json()
-    ids = data.get("ids", [])
+    ids = set(data.get("ids", []))
     if not ids:
         return jsonify({"error": "Niciun ID specificat"}), 400
 
-    history = load_history()
-    deleted = 0
-    for uid in ids:
-        entry = next((u for u in history["uploads"] if u["id"] == uid), None)
-        if entry:
-            filepath = OUTPUT_DIR / entry.get("saved_as", "")
-            if filepath.exists():
-                filepath.unlink()
-            deleted += 1
-    history["uploads"] = [u for u in history["uploads"] if u["id"] not in ids]
-    save_history(history)
-    return jsonify({"success": True, "deleted": deleted})
+    with history_write_lock():
+        history = load_history()
+        tombstones = []
+        remaining = []
+        for u in history["uploads"]:
+            if u["id"] in ids:
+                _drop_upload(history, u)
+                tombstones.append({"_delete": u["id"]})
+            else:
+                remaining.append(u)
+        history["uploads"] = remaining
+        append_history(history, tombstones)
+    return jsonify({"success": True, "deleted": len(tombstones)})
 
 
 @app.route("/api/reset-period", methods=["POST"])
@@ -306,47 +716,71 @@ def reset_period():
     if not date_from or not date_to:
         return jsonify({"error": "Specifica perioada (from, to)"}), 400
 
-    history = load_history()
-    to_delete = [u for u in history["uploads"] if date_from <= u["timestamp"][:10] <= date_to]
-
-    for entry in to_delete:
-        filepath = OUTPUT_DIR / entry.get("saved_as", "")
-        if filepath.exists():
-            filepath.unlink()
-
-    deleted = len(to_delete)
-    history["uploads"] = [u for u in history["uploads"] if not (date_from <= u["timestamp"][:10] <= date_to)]
-    save_history(history)
-    return jsonify({"success": True, "deleted": deleted})
+    with history_write_lock():
+        history = load_history()
+        tombstones = []
+        remaining = []
+        for u in history["uploads"]:
+            if date_from <= u["date"] <= date_to:
+                _drop_upload(history, u)
+                tombstones.append({"_delete": u["id"]})
+            else:
+                remaining.append(u)
+        history["uploads"] = remaining
+        append_history(history, tombstones)
+    return jsonify({"success": True, "deleted": len(tombstones)})
 
 
 @app.route("/api/export-excel")
 def export_excel():
-    if not EXCEL_FILE.exists():
-        history = load_history()
-        save_excel(history)
-    return send_file(str(EXCEL_FILE), as_attachment=True, download_name="upload_history.xlsx")
+    # history.xlsx.key holds the cache key of the history snapshot the
+    # workbook was built from, so any worker process can tell whether it is
+    # stale. Builds are serialized across workers, which keeps the two files
+    # in step; the workbook is opened for sending before the lock is released.
+    with _process_lock(_excel_lock, EXCEL_LOCK_FILE):
+        history = load_history_readonly()
+        key = repr(history["_key"])
+        try:
+            built_from = EXCEL_KEY_FILE.read_text()
+        except FileNotFoundError:
+            built_from = None
+        if built_from != key or not EXCEL_FILE.exists():
+            save_excel(history)
+            EXCEL_KEY_FILE.write_text(key)
+        return send_file(str(EXCEL_FILE), as_attachment=True, download_name="upload_history.xlsx")
 
 
 @app.route("/api/settings", methods=["GET", "POST"])
 def settings():
-    history = load_history()
     if request.method == "POST":
         data = request.get_json()
-        history["settings"] = {
+        s = {
             "monthly_income": float(data.get("monthly_income", 2000)),
             "daily_pages": int(data.get("daily_pages", 700)),
             "days_per_month": int(data.get("days_per_month", 30)),
         }
-        save_history(history)
-        s = history["settings"]
+        with history_write_lock():
+            history = load_history()
+            history["settings"] = s
+            append_history(history, [{"_settings": s}])
         new_cost = s["monthly_income"] / (s["daily_pages"] * s["days_per_month"])
         return jsonify({"success": True, "cost_per_page": round(new_cost, 6)})
-    return jsonify(history.get("settings", {"monthly_income": 2000, "daily_pages": 700, "days_per_month": 30}))
+    history = load_history_readonly()
+    return jsonify(history.get("settings", _default_settings()))
+
+
+_migrate_legacy_history()
 
 
 if __name__ == "__main__":
     print(f"  Output folder: {OUTPUT_DIR}")
     print(f"  Cost per page: {COST_PER_PAGE:.6f} EUR")
     print(f"  History: {HISTORY_FILE}")
-    app.run(debug=True, port=5000, use_reloader=False)
+    try:
+        from waitress import serve
+    except ImportError:
+        app.run(debug=True, port=5000, use_reloader=False)
+    else:
+        # Multi-threaded production server; runs on Windows too. waitress caps
+        # request bodies at 1 GiB by default, below a full batch of uploads.
+        serve(app, host="127.0.0.1", port=5000, threads=8, max_request_body_size=MAX_REQUEST_BYTES)
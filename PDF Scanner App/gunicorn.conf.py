@@ -0,0 +1,15 @@
+# Production server for Linux/macOS. Run from this folder:
+#
+#     gunicorn app:app
+#
+# gunicorn reads this file automatically. Writes to data/history.jsonl are
+# serialized across the workers with a file lock (see history_write_lock in
+# app.py). The threads let each worker serve requests while another one is
+# busy counting PDF pages. On Windows use `python app.py`, which runs
+# waitress when it is installed.
+
+bind = "127.0.0.1:5000"
+workers = 4
+worker_class = "gthread"
+threads = 4
+timeout = 300  # large batches of scans can take a while to upload
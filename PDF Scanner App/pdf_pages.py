@@ -0,0 +1,109 @@
+"""Page counting for uploaded PDFs."""
+
+import mmap
+import re
+import sys
+import threading
+
+import pypdfium2 as pdfium
+
+# PDFium is not thread-safe; every call into it must hold this lock.
+_pdfium_lock = threading.Lock()
+
+# A PDF stores its page count as /Count in the root /Pages object. For files
+# with a classic xref table we can jump straight to it: startxref -> xref
+# table (+ /Prev chain) -> /Root catalog -> /Pages -> /Count.
+_STARTXREF_RE = re.compile(rb"startxref\s+(\d+)")
+_ROOT_RE = re.compile(rb"/Root\s+(\d+)\s+\d+\s+R")
+_PREV_RE = re.compile(rb"/Prev\s+(\d+)")
+_PAGES_RE = re.compile(rb"/Pages\s+(\d+)\s+\d+\s+R")
+# (?!\d) stops the number from backtracking into a shorter match, so an
+# indirect "/Count 57 0 R" is rejected instead of read as 5.
+_COUNT_RE = re.compile(rb"/Count\s+(\d+)(?!\d)(?!\s+\d+\s+R)")
+_OBJ_HEADER_RE = re.compile(rb"\s*(\d+)\s+\d+\s+obj\b")
+
+
+def _read_xref_table(mm, pos, offsets):
+    """Parse the xref table at pos into offsets; return the trailer bytes.
+
+    Entries already present in offsets come from a newer section and win.
+    Free entries are recorded as None so they hide older offsets too.
+    """
+    if mm[pos:pos + 4] != b"xref":
+        return None  # cross-reference stream (PDF 1.5+), not handled here
+    trailer_pos = mm.find(b"trailer", pos)
+    if trailer_pos < 0:
+        return None
+    tokens = mm[pos + 4:trailer_pos].split()
+    i = 0
+    while i + 1 < len(tokens):
+        start, count = int(tokens[i]), int(tokens[i + 1])
+        i += 2
+        for num in range(start, start + count):
+            offset, kind = tokens[i], tokens[i + 2]
+            i += 3
+            offsets.setdefault(num, int(offset) if kind == b"n" else None)
+    end = mm.find(b"startxref", trailer_pos)
+    return mm[trailer_pos:end if end > 0 else trailer_pos + 4096]
+
+
+def _read_object(mm, offsets, num):
+    offset = offsets.get(num)
+    if offset is None:
+        return None
+    header = _OBJ_HEADER_RE.match(mm, offset)
+    if not header or int(header.group(1)) != num:
+        return None
+    end = mm.find(b"endobj", offset)
+    return mm[offset:end] if end > 0 else None
+
+
+def _fast_page_count(filepath):
+    """Return the page count read directly from the page tree root, or None."""
+    try:
+        with open(filepath, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            startxref = _STARTXREF_RE.findall(mm[-1024:])
+            if not startxref:
+                return None
+            offsets = {}
+            root = None
+            pos, seen = int(startxref[-1]), set()
+            while pos is not None and pos not in seen:
+                seen.add(pos)
+                trailer = _read_xref_table(mm, pos, offsets)
+                if trailer is None:
+                    return None
+                if b"/XRefStm" in trailer:
+                    # Hybrid file: objects missing from this table may live in
+                    # object streams listed only in the xref stream.
+                    return None
+                m = _ROOT_RE.search(trailer)
+                if root is None and m:
+                    root = int(m.group(1))
+                m = _PREV_RE.search(trailer)
+                pos = int(m.group(1)) if m else None
+            if root is None:
+                return None
+            catalog = _read_object(mm, offsets, root)
+            m = _PAGES_RE.search(catalog) if catalog else None
+            pages = _read_object(mm, offsets, int(m.group(1))) if m else None
+            m = _COUNT_RE.search(pages) if pages else None
+            return int(m.group(1)) if m else None
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def count_pdf_pages(filepath):
+    pages = _fast_page_count(filepath)
+    if pages is not None:
+        return pages
+    try:
+        with _pdfium_lock:
+            doc = pdfium.PdfDocument(str(filepath))
+            try:
+                return len(doc)
+            finally:
+                doc.close()
+    except Exception as e:
+        print(f"Error reading {filepath}: {e}", file=sys.stderr)
+        return 0
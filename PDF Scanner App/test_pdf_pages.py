@@ -0,0 +1,107 @@
+import pypdfium2 as pdfium
+import pytest
+
+from pdf_pages import _COUNT_RE, _fast_page_count, count_pdf_pages
+
+
+def build_pdf(pages_dict, n_pages, extra_objects=()):
+    """Assemble a PDF with a classic xref table.
+
+    pages_dict is the body of the root /Pages dictionary (object 2); the
+    page objects are numbered from 3.
+    """
+    kids = " ".join(f"{3 + i} 0 R" for i in range(n_pages))
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        ("<< /Type /Pages /Kids [" + kids + "] " + pages_dict + " >>").encode(),
+    ]
+    objects += [b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 100 100] >>"] * n_pages
+    objects += list(extra_objects)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for num, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % num + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def pdfium_count(path):
+    doc = pdfium.PdfDocument(str(path))
+    try:
+        return len(doc)
+    finally:
+        doc.close()
+
+
+@pytest.mark.parametrize("text, expected", [
+    (b"/Count 3 ", b"3"),
+    (b"/Count 123>>", b"123"),
+    (b"/Count 1 0 R", None),
+    (b"/Count 12 0 R", None),
+    (b"/Count 123 0 R", None),
+])
+def test_count_regex(text, expected):
+    m = _COUNT_RE.search(text)
+    assert (m.group(1) if m else None) == expected
+
+
+def test_direct_count(tmp_path):
+    path = tmp_path / "direct.pdf"
+    path.write_bytes(build_pdf("/Count 3", 3))
+    assert _fast_page_count(path) == 3
+    assert count_pdf_pages(path) == pdfium_count(path) == 3
+
+
+@pytest.mark.parametrize("ref", [12, 57, 123])
+def test_indirect_count_falls_back_to_pdfium(tmp_path, ref):
+    # Objects 1-5 are the catalog, page tree and pages; pad with nulls so
+    # object `ref` holds the count.
+    extra = [b"null"] * (ref - 6) + [b"3"]
+    path = tmp_path / "indirect.pdf"
+    path.write_bytes(build_pdf(f"/Count {ref} 0 R", 3, extra))
+    assert _fast_page_count(path) is None
+    assert count_pdf_pages(path) == pdfium_count(path) == 3
+
+
+def add_page_hybrid(pdf):
+    """Append an incremental update that adds a fourth page, hybrid style.
+
+    The new page and the replacement page tree live in an object stream
+    that only the /XRefStm cross-reference stream knows about; the classic
+    table of the update lists just the object and xref streams.
+    """
+    prev = int(pdf.rsplit(b"startxref", 1)[1].split()[0])
+    objs = [
+        b"<< /Type /Pages /Kids [3 0 R 4 0 R 5 0 R 6 0 R] /Count 4 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 100 100] >>",
+    ]
+    header = b"2 0 6 %d " % (len(objs[0]) + 1)
+    body = objs[0] + b" " + objs[1]
+    out = bytearray(pdf)
+    objstm = len(out)
+    out += (b"7 0 obj\n<< /Type /ObjStm /N 2 /First %d /Length %d >>\nstream\n"
+            % (len(header), len(header) + len(body)) + header + body + b"\nendstream\nendobj\n")
+    xrefstm = len(out)
+    rows = (b"\x02\x00\x07\x00" + b"\x02\x00\x07\x01"
+            + b"\x01" + objstm.to_bytes(2, "big") + b"\x00"
+            + b"\x01" + xrefstm.to_bytes(2, "big") + b"\x00")
+    out += (b"8 0 obj\n<< /Type /XRef /Size 9 /W [1 2 1] /Index [2 1 6 3] /Root 1 0 R /Length %d >>\nstream\n"
+            % len(rows) + rows + b"\nendstream\nendobj\n")
+    xref = len(out)
+    out += b"xref\n7 2\n%010d 00000 n \n%010d 00000 n \n" % (objstm, xrefstm)
+    out += (b"trailer\n<< /Size 9 /Root 1 0 R /Prev %d /XRefStm %d >>\nstartxref\n%d\n%%%%EOF\n"
+            % (prev, xrefstm, xref))
+    return bytes(out)
+
+
+def test_hybrid_update_falls_back_to_pdfium(tmp_path):
+    path = tmp_path / "hybrid.pdf"
+    path.write_bytes(add_page_hybrid(build_pdf("/Count 3", 3)))
+    assert _fast_page_count(path) is None
+    assert count_pdf_pages(path) == pdfium_count(path) == 4